@@ -28,4 +28,8 @@ class Agent:
 class RandomAgent(Agent):
 
     def get_action(self, state: GameState) -> int:
-        return random.choice(state.get_legal_moves())
\ No newline at end of file
+        # Draw the k-th legal move straight from the legal mask, without building the list of legal moves
+        mask: int = state.get_legal_mask()
+        for _ in range(random.randrange(mask.bit_count())):
+            mask &= mask - 1  # Clear the lowest set bit
+        return (mask & -mask).bit_length() - 1
\ No newline at end of file
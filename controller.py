@@ -1,13 +1,14 @@
+import math
 import pygame
-import sys
+import random
 import os
-import numpy as np
-from engine import GameState, Action
+from multiprocessing import Pool
+from engine import GameState, Action, canonical_key
 from agent import Agent
 from settings import GAME_H, GAME_W
-from utils import get_board_matrix, inside_case
-from minimax import alpha_beta_search
-from mcts import Node, monte_carlo_tree_search
+from utils import get_board_matrix, get_case_lookup
+from minimax import SHARED_TT, alpha_beta_search, get_best_move
+from mcts import Node, monte_carlo_tree_search, mcts_root_visits
 
 
 class Controller:
@@ -31,18 +32,56 @@ class Controller:
         assert index in [0, 1], f"Only two players, got player number {index}"
         self.index: int = index  # Store the player's index (0 for X, 1 for O)
     
-    def process_inputs(self, state: GameState, move_history: list[Action] | None) -> None:
+    def select_move(self, state: GameState, events: list[pygame.event.Event] | None = None) -> Action:
         """
-        Process player inputs and modify the game state. Must be implemented by subclasses.
+        Select the player's move. Must be implemented by subclasses.
         
         Parameters:
         - state (GameState): The current state of the game.
-        - move_history (list[Action] | None): Optional history of previous moves (useful for AI decision-making).
+        - events (list[pygame.event.Event] | None): The input events of the current frame, polled once by the game loop.
+        
+        Returns:
+        - Action: The selected action (its position may be illegal, e.g., -1 when a human has not played yet).
         
         Raises:
         - NotImplementedError: This method must be overridden in subclasses to provide specific behavior for each controller type.
         """
-        raise NotImplementedError("Abstract class - process_inputs must be implemented in subclasses")
+        raise NotImplementedError("Abstract class - select_move must be implemented in subclasses")
+    
+    def process_inputs(self, state: GameState, move_history: list[Action] | None,
+                       events: list[pygame.event.Event] | None = None) -> bool:
+        """
+        Process player inputs and modify the game state: select the player's move and apply it if it is legal.
+        
+        Parameters:
+        - state (GameState): The current state of the game.
+        - move_history (list[Action] | None): Optional history of previous moves (useful for AI decision-making).
+        - events (list[pygame.event.Event] | None): The input events of the current frame, polled once by the game loop.
+        
+        Returns:
+        - bool: True if a move was applied to the game state, False otherwise (e.g., a human has not clicked on an empty case yet).
+        """
+        # Select the player's move (implemented by each controller type)
+        action: Action = self.select_move(state, events)
+
+        # Check if the selected move is a legal move
+        if state.is_legal_move(action.pos):
+            # If move history tracking is enabled, add this move to the history
+            if move_history is not None:
+                move_history.append(action)
+
+            # Apply the selected action to the game state (update the board)
+            state.apply_action(action)
+            return True
+
+        return False
+
+    def close(self) -> None:
+        """
+        Release the resources held by the controller (e.g., worker processes) once it is no longer used.
+        Nothing to release by default.
+        """
+        pass
 
 
 class HumanController(Controller):
@@ -60,56 +99,52 @@ class HumanController(Controller):
         """
         # Call the parent Controller class to initialize the player's index
         super().__init__(index)
+        # Precompute the case under each screen pixel column/row once, instead of inspecting the board image on every click
+        self._case_columns: list[int]
+        self._case_rows: list[int]
+        self._case_columns, self._case_rows = get_case_lookup(get_board_matrix(os.path.join("img", "board.png")))
 
-    def get_inputs(self) -> Action:
+    def get_inputs(self, events: list[pygame.event.Event]) -> Action:
         """
-        Capture input from a human player and translate it into a game action.
-        This method listens for mouse clicks to determine the player's move.
+        Translate the input of a human player into a game action.
+        This method looks for a mouse click among the events of the frame to determine the player's move.
+
+        Parameters:
+        - events (list[pygame.event.Event]): The input events of the current frame.
 
         Returns:
         - Action: The action object containing the player's index and the selected position on the board.
         """
         computed_pos: int = -1  # Initialize the position as -1 (invalid by default)
 
-        # Loop through the events captured by pygame
-        for event in pygame.event.get():
-            # If the user tries to close the game window, quit the game
-            if event.type == pygame.QUIT:
-                pygame.quit()  # Close the pygame window
-                sys.exit()  # Exit the program
-
+        # Loop through the events of the frame
+        for event in events:
             # Check if the player has clicked the mouse
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()  # Get the position of the mouse click
-
-                # Convert the mouse position to a board position
-                computed_pos = inside_case(mouse_pos, get_board_matrix(os.path.join("img", "board.png")))
+                # Convert the position of the mouse click to a board position
+                x, y = event.pos
+                column: int = self._case_columns[x] if 0 <= x < GAME_W else -1
+                row: int = self._case_rows[y] if 0 <= y < GAME_H else -1
+                computed_pos = 3 * column + row if column >= 0 and row >= 0 else -1
 
         # Return an Action object with the player's index and the computed board position
         return Action(agent=self.index, pos=computed_pos)
 
-    def process_inputs(self, state: GameState, move_history: list[Action] | None) -> None:
+    def select_move(self, state: GameState, events: list[pygame.event.Event] | None = None) -> Action:
         """
-        Process the human player's input and apply their move to the game state.
+        Select the human player's move from the mouse clicks of the frame.
         
         Parameters:
         - state (GameState): The current state of the game.
-        - move_history (list[Action] | None): A list storing previous moves (optional).
+        - events (list[pygame.event.Event] | None): The input events of the current frame.
+        
+        Returns:
+        - Action: The clicked action, with position -1 if the player did not click on a case.
         """
-        # Get the player's action (input) by calling get_inputs
-        action: Action = self.get_inputs()
-
-        # Check if the chosen position is a legal move
-        if action.pos in state.get_legal_moves():
-            # If move history tracking is enabled, add this move to the history
-            if move_history:
-                move_history.append(action)
-
-            # Apply the action to the game state (update the board)
-            state.apply_action(action)
-        else:
-            # If the move is illegal, do nothing (can add feedback or error handling here if needed)
-            pass
+        # Most frames have no input event: nothing to look for
+        if not events:
+            return Action(agent=self.index, pos=-1)
+        return self.get_inputs(events)
 
 
 class MinimaxController(Controller):
@@ -127,115 +162,170 @@ class MinimaxController(Controller):
         """
         # Call the parent Controller class to initialize the player's index
         super().__init__(index)
+        # Transposition table (canonical key -> (flag, value)), shared with the other Minimax controllers
+        # and kept across moves and games: the solved positions are never searched again
+        self.tt: dict[int, tuple[int, float]] = SHARED_TT
     
-    def select_move(self, state: GameState) -> Action:
+    def select_move(self, state: GameState, events: list[pygame.event.Event] | None = None) -> Action:
         """
         Select the best move for the AI player using the Minimax algorithm with Alpha-Beta pruning.
 
+        The best moves of all the positions reachable in a game are solved once (see
+        `precompute_best_moves`), so the move is read from that table. Positions that
+        cannot be reached in a game are searched.
+
         Parameters:
         - state (GameState): The current state of the game.
+        - events (list[pygame.event.Event] | None): Unused, the move is computed.
 
         Returns:
         - Action: The optimal action selected based on the Minimax evaluation.
         """
-        # Initialize best_value based on the player's index:
-        # Player 0 (X) is maximizing, so best_value starts at negative infinity.
-        # Player 1 (O) is minimizing, so best_value starts at positive infinity.
-        if self.index == 0:
-            best_value = -np.inf  # Maximizing player
-        else:
-            best_value = np.inf  # Minimizing player
-
-        # Initialize the best action with a default invalid move (-1).
-        best_action = Action(agent=self.index, pos=-1)
-
-        # Loop through all legal moves available in the current game state
-        for pos in state.get_legal_moves():
-            action = Action(agent=self.index, pos=pos)  # Create an action for each move
-            successor = state.generate_successor(action)  # Generate the resulting state after the action
-            
-            # Use Alpha-Beta search to evaluate the value of the successor state
-            value = alpha_beta_search(successor, bool(self.index))
-
-            # Maximizing player 0 (X): update if a higher value is found
-            if self.index == 0:
-                if value > best_value:
-                    best_value = value
-                    best_action = action
-            # Minimizing player 1 (O): update if a lower value is found
-            else:
-                if value < best_value:
-                    best_value = value
-                    best_action = action
-
-        # Return the best action determined by the Minimax algorithm
-        return best_action
-    
-    def process_inputs(self, state: GameState, move_history: list[Action] | None) -> None:
+        best_pos: int = get_best_move(state, self.index)
+        if best_pos == -1:
+            best_pos = self.search_move(state)
+        return Action(agent=self.index, pos=best_pos)
+
+    def search_move(self, state: GameState) -> int:
         """
-        Process the inputs by selecting and applying the best move using the Minimax algorithm.
-        
+        Search the best move for the AI player with Alpha-Beta pruning from the root.
+
         Parameters:
         - state (GameState): The current state of the game.
-        - move_history (list[Action] | None): A list storing previous moves (optional).
+
+        Returns:
+        - int: The position of the best move (-1 if there is no legal move).
         """
-        # Select the best move using the Minimax algorithm
-        action: Action = self.select_move(state=state)
+        # Player 0 (X) maximizes the value and player 1 (O) minimizes it. Values are multiplied
+        # by the player's sign, so that both players maximize and the loop does not branch on the player.
+        sign: float = 1. if self.index == 0 else -1.
+        opponent_max_p: bool = bool(self.index)  # The opponent plays in the successor states
+        best_value: float = -math.inf
 
-        # Check if the selected move is a legal move
-        if action.pos in state.get_legal_moves():
-            # If move history tracking is enabled, add this move to the history
-            if move_history:
-                move_history.append(action)
+        # Initialize the best position with a default invalid move (-1).
+        best_pos: int = -1
 
-            # Apply the selected action to the game state (update the board)
-            state.apply_action(action)
-        else:
-            # If the move is illegal, do nothing (can add feedback or error handling here if needed)
-            pass
+        # A single scratch action is reused for every move: apply_action does not keep a reference to it
+        action = Action(agent=self.index, pos=-1)
+
+        # Loop through the legal moves (strongest squares first, which maximizes alpha-beta cutoffs)
+        searched: set[int] = set()
+        for pos in state.get_legal_moves():
+            action.pos = pos
+            successor = state.generate_successor(action)  # Generate the resulting state after the action
+
+            # A move leading to a rotation/reflection of an already searched position has the same value
+            canonical: int = canonical_key(successor.data)
+            if canonical in searched:
+                continue
+            searched.add(canonical)
+            
+            # Use Alpha-Beta search to evaluate the value of the successor state.
+            # The best value so far bounds the search (as alpha for X, as beta for O):
+            # a move that cannot beat it is cut off early.
+            alpha, beta = sorted((sign * best_value, sign * math.inf))
+            value = sign * alpha_beta_search(successor, opponent_max_p, alpha=alpha, beta=beta, tt=self.tt)
+            if value > best_value:
+                best_value = value
+                best_pos = pos
+                if best_value >= 1.:
+                    break  # A winning move cannot be improved upon
+
+        return best_pos
 
 
 class MCTSController(Controller):
     """
     """
-    def __init__(self, index: int, simulations: int = 10000) -> None:
+    def __init__(self, index: int, simulations: int = 10000, workers: int | None = 1) -> None:
         super().__init__(index)
         self.simulations: int = simulations
         self.exploration_value: float = 3.
+        self.batch_size: int = 8  # Simulations selected together before being backpropagated
+        self.rollouts: int = 16  # Random games played at once (with NumPy) per simulation
+        # Root parallelization: with several workers, each process grows its own tree
+        # with a share of the simulations and the root visit counts are summed (None: one worker per CPU).
+        self.workers: int = workers if workers is not None else (os.cpu_count() or 1)
+        self._pool: Pool | None = None  # Created on the first parallel search, then reused
+        # Tree reuse: the node of the move played last, whose subtree is searched again on the next move
+        self._root: Node | None = None
     
-    def select_move(self, state: GameState) -> Action:
+    def select_move(self, state: GameState, events: list[pygame.event.Event] | None = None) -> Action:
+
+        if self.workers > 1:
+            return Action(agent=self.index, pos=self.select_move_parallel(state))
 
-        root: Node = Node(state=state)
+        root: Node = self.get_root(state)
 
         best_node: Node = monte_carlo_tree_search(root=root,
                                                   iterations=self.simulations,
                                                   index=self.index,
-                                                  c=self.exploration_value)
+                                                  c=self.exploration_value,
+                                                  batch_size=self.batch_size,
+                                                  rollouts=self.rollouts)
+
+        # Keep the subtree of the selected move for the next turn
+        best_node.parent = None
+        self._root = best_node
 
         return Action(agent=self.index, pos=best_node.pos)
-    
-    def process_inputs(self, state: GameState, move_history: list[Action] | None) -> None:
+
+    def get_root(self, state: GameState) -> Node:
         """
-        Process the inputs by selecting and applying the agent's move based on the current game state.
-        
+        Get the root of the search for the state, reusing the tree of the previous move when possible.
+
+        The opponent's reply is one of the children of the node of the move played last:
+        its subtree, with all its statistics, becomes the new root.
+
         Parameters:
         - state (GameState): The current state of the game.
-        - move_history (list[Action] | None): A list storing previous moves (optional).
+
+        Returns:
+        - Node: The root of the search.
+        """
+        if self._root is not None:
+            for child in self._root.children:
+                if child.state.data == state.data:
+                    child.parent = None
+                    return child
+        return Node(state=state)
+
+    def select_move_parallel(self, state: GameState) -> int:
         """
-        # Select the agent's move using the select_move method
-        action: Action = self.select_move(state=state)
+        Run one independent search per worker process and pick the move with the most visits overall.
 
-        # Check if the selected move is a legal move
-        if action.pos in state.get_legal_moves():
-            # If move history tracking is enabled, add this move to the history
-            if move_history:
-                move_history.append(action)
+        Parameters:
+        - state (GameState): The current state of the game.
 
-            # Apply the selected action to the game state (update the board)
-            state.apply_action(action)
-        else:
-            # If the move is illegal, do nothing (can add feedback or error handling here if needed)
-            pass
+        Returns:
+        - int: The position of the selected move.
+        """
+        if self._pool is None:
+            self._pool = Pool(self.workers)
+
+        # No more workers than simulations, so that every worker runs at least one
+        workers: int = max(1, min(self.workers, self.simulations))
+
+        # Each worker gets its own seed so that the trees differ
+        jobs = [(state, self.simulations // workers, self.index, self.exploration_value, self.batch_size, self.rollouts,
+                 random.getrandbits(32))
+                for _ in range(workers)]
+
+        visits: dict[int, int] = {}
+        for root_visits in self._pool.starmap(mcts_root_visits, jobs):
+            for pos, count in root_visits.items():
+                visits[pos] = visits.get(pos, 0) + count
+
+        return max(visits, key=visits.__getitem__)
+
+    def close(self) -> None:
+        """
+        Shut down the worker processes of the parallel search, if any were started.
+        """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
 
 
 class AgentController(Controller):
@@ -257,12 +347,13 @@ class AgentController(Controller):
         super().__init__(index)
         self.agent: Agent = agent  # Store the agent responsible for move selection
     
-    def select_move(self, state: GameState) -> Action:
+    def select_move(self, state: GameState, events: list[pygame.event.Event] | None = None) -> Action:
         """
         Select the next move for the AI agent based on the current game state.
         
         Parameters:
         - state (GameState): The current state of the game.
+        - events (list[pygame.event.Event] | None): Unused, the move is computed.
         
         Returns:
         - Action: The action selected by the agent, consisting of the player's index and the position on the board.
@@ -273,26 +364,3 @@ class AgentController(Controller):
         # Return an Action object with the player's index and selected position
         return Action(agent=self.index, pos=pos)
     
-    def process_inputs(self, state: GameState, move_history: list[Action] | None) -> None:
-        """
-        Process the inputs by selecting and applying the agent's move based on the current game state.
-        
-        Parameters:
-        - state (GameState): The current state of the game.
-        - move_history (list[Action] | None): A list storing previous moves (optional).
-        """
-        # Select the agent's move using the select_move method
-        action: Action = self.select_move(state=state)
-
-        # Check if the selected move is a legal move
-        if action.pos in state.get_legal_moves():
-            # If move history tracking is enabled, add this move to the history
-            if move_history:
-                move_history.append(action)
-
-            # Apply the selected action to the game state (update the board)
-            state.apply_action(action)
-        else:
-            # If the move is illegal, do nothing (can add feedback or error handling here if needed)
-            pass
-
@@ -14,10 +14,61 @@ The file also includes a set of unit tests to ensure the correctness of the game
 """
 
 import unittest
-from copy import deepcopy
+from array import array
 from dataclasses import dataclass
 
-@dataclass
+# Bitboard with the 9 positions set
+FULL_BOARD: int = 0x1FF
+
+# Positions ordered from the strongest to the weakest opening square (center, corners, edges).
+# Moves are generated in this order, so that searches try strong moves first: alpha-beta
+# tightens its window early and prunes more of the tree.
+MOVE_ORDER: tuple[int, ...] = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+# The positions of each 9-bit mask (in MOVE_ORDER), precomputed for the 512 masks: the legal moves
+# of a board are read with the mask of its empty positions as index, without looping over the board.
+MOVES_OF_MASK: tuple[tuple[int, ...], ...] = tuple(tuple(i for i in MOVE_ORDER if mask >> i & 1) for mask in range(FULL_BOARD + 1))
+
+# The 8 symmetries of the board (rotations and reflections) as permutations of the positions:
+# the transformed board is [squares[p] for p in permutation].
+SYMMETRIES: list[tuple[int, ...]] = [
+    (0, 1, 2, 3, 4, 5, 6, 7, 8),  # Identity
+    (6, 3, 0, 7, 4, 1, 8, 5, 2),  # Rotation by 90 degrees
+    (8, 7, 6, 5, 4, 3, 2, 1, 0),  # Rotation by 180 degrees
+    (2, 5, 8, 1, 4, 7, 0, 3, 6),  # Rotation by 270 degrees
+    (2, 1, 0, 5, 4, 3, 8, 7, 6),  # Horizontal reflection
+    (6, 7, 8, 3, 4, 5, 0, 1, 2),  # Vertical reflection
+    (0, 3, 6, 1, 4, 7, 2, 5, 8),  # Reflection along the main diagonal
+    (8, 5, 2, 7, 4, 1, 6, 3, 0),  # Reflection along the anti-diagonal
+]
+
+
+# The symmetries applied to bitboards: PERMUTED_BITS[i][bits] is the bitboard `bits` transformed by SYMMETRIES[i],
+# precomputed for the 512 bitboards so that a transform is a single lookup.
+PERMUTED_BITS: list[tuple[int, ...]] = [
+    tuple(sum(1 << i for i, p in enumerate(permutation) if bits >> p & 1) for bits in range(FULL_BOARD + 1))
+    for permutation in SYMMETRIES
+]
+
+
+def canonical_key(data: 'GameStateData') -> int:
+    """
+    Get a key identifying the board up to the 8 board symmetries.
+
+    Boards that are rotations or reflections of each other share the same key (the smallest
+    of the packed bitboards of their images), and therefore the same game value.
+
+    Parameters:
+    - data (GameStateData): The board.
+
+    Returns:
+    - int: The canonical key, an 18-bit integer.
+    """
+    x_bits: int = data.x_bits
+    o_bits: int = data.o_bits
+    return min(table[x_bits] << 9 | table[o_bits] for table in PERMUTED_BITS)
+
+@dataclass(slots=True)
 class Action:
     """Action performed by Controller."""
     agent: int
@@ -30,11 +81,14 @@ class GameState:
     It manages the current game board, tracks win/lose/tie conditions,
     and can generate successors for game tree exploration.
     """
+
+    __slots__ = ("data",)
+
     def __init__(self, prev_state: 'GameState | None' = None) -> None:
         """
         Initialize a new GameState.
         
-        If a previous state is provided, the new state is a deep copy of the previous state,
+        If a previous state is provided, the new state is a copy of the previous state,
         preserving the game's history. If no previous state is provided, a new game starts
         with an empty board.
         
@@ -42,7 +96,7 @@ class GameState:
         - prev_state: The previous GameState to copy (optional).
         """
         if prev_state is not None:
-            self.data: 'GameStateData' = deepcopy(prev_state.data)
+            self.data: 'GameStateData' = GameStateData(prev_state.data)
         else:
             self.data = GameStateData()
     
@@ -53,7 +107,7 @@ class GameState:
         Returns:
         - bool: True if the state is a terminal state, False otherwise.
         """
-        return self.is_win() or self.is_lose() or self.is_tie()
+        return self.data._over
     
     def is_win(self) -> bool:
         """
@@ -86,24 +140,22 @@ class GameState:
         """
         Compute and update the outcome of the game based on the current state.
         
-        This method checks all possible winning combinations to determine if the game
-        has been won or lost. If the board is full and no winner is found, it sets the game
-        as a tie.
-        """
-        for indices in self.data.winning_combinations:
-            states = [self.data.squares[idx] for idx in indices]
-            if states == [1, 1, 1]:
-                self.data._win = True
-            elif states == [2, 2, 2]:
-                self.data._lose = True
-        if self.data.squares.count(0) == 0:
-            self.data._tie = True
+        A board has been won or lost if one of the winning combinations is complete, and is a tie
+        if it is full and no winner is found. The outcome of every board is precomputed in TERMINAL.
+        """
+        data = self.data
+        outcome: int = TERMINAL[data.x_bits << 9 | data.o_bits]
+        data._win = outcome == 1
+        data._lose = outcome == -1
+        data._tie = outcome == 0
+        data._over = outcome != NOT_TERMINAL
     
     def get_legal_moves(self) -> list[int]:
         """
         Get a list of all legal moves available in the current state.
         
-        Legal moves are positions on the board that are not yet occupied.
+        Legal moves are positions on the board that are not yet occupied. They are ordered
+        best-first (center, corners, edges, see MOVE_ORDER), so searches do not need to sort them.
         
         Returns:
         - list[int]: A list of indices corresponding to empty positions on the board.
@@ -111,7 +163,34 @@ class GameState:
         # Check that successors exist
         if self.is_game_over():
             return []
-        return [i for i, mark in enumerate(self.data.squares) if mark == 0]
+        # A new list each time: callers are free to modify it
+        return list(MOVES_OF_MASK[FULL_BOARD & ~(self.data.x_bits | self.data.o_bits)])
+
+    def get_legal_mask(self) -> int:
+        """
+        Get the legal moves of the current state packed into a 9-bit mask.
+        
+        Bit i is set if position i is a legal move, so a membership test is
+        a single `mask >> pos & 1` instead of a scan over `get_legal_moves()`.
+        
+        Returns:
+        - int: A bit mask of the empty positions on the board (0 if the state is terminal).
+        """
+        if self.is_game_over():
+            return 0
+        return FULL_BOARD & ~(self.data.x_bits | self.data.o_bits)
+
+    def is_legal_move(self, pos: int) -> bool:
+        """
+        Check if a position is a legal move in the current state.
+        
+        Parameters:
+        - pos (int): The position on the board (any integer, -1 being the usual "no move").
+        
+        Returns:
+        - bool: True if the position is on the board, empty, and the game is not over.
+        """
+        return 0 <= pos <= 8 and bool(self.get_legal_mask() >> pos & 1)
     
     def apply_action(self, move: Action) -> None:
         """Place a mark by the agent in the spot given.
@@ -125,11 +204,45 @@ class GameState:
         """
         assert move.pos >= 0 and move.pos <= 8, "Invalid insert location"
         assert move.agent in [0, 1], "Invalid agent"
-        assert self.data.squares[move.pos] == 0, "Location is not empty"
-
-        # agent is [0, 1]. board values are stored as [1, 2].
-        self.data.squares[move.pos] = move.agent + 1
-        self.update()
+        bit: int = 1 << move.pos
+        assert not (self.data.x_bits | self.data.o_bits) & bit, "Location is not empty"
+
+        data = self.data
+        # agent is [0, 1]: agent 0 marks x_bits, agent 1 marks o_bits.
+        if move.agent == 0:
+            data.x_bits |= bit
+            bits: int = data.x_bits
+        else:
+            data.o_bits |= bit
+            bits = data.o_bits
+
+        # Update the outcome incrementally: only the lines through the new mark can have been completed
+        if any(bits & mask == mask for mask in LINES_THROUGH[move.pos]):
+            if move.agent == 0:
+                data._win = True
+            else:
+                data._lose = True
+        data._tie = (data.x_bits | data.o_bits) == FULL_BOARD and not (data._win or data._lose)
+        data._over = data._win or data._lose or data._tie
+
+    def undo_action(self, move: Action) -> None:
+        """Remove the mark placed by `apply_action(move)`.
+
+        This lets a search explore the game tree on a single state (apply, recurse, undo)
+        instead of allocating a successor per node. The move must be the last one applied,
+        and the state before it must not have been terminal (which is always the case for a legal move).
+        """
+        bit: int = 1 << move.pos
+        if move.agent == 0:
+            assert self.data.x_bits & bit, "Location does not hold the agent's mark"
+            self.data.x_bits ^= bit
+        else:
+            assert self.data.o_bits & bit, "Location does not hold the agent's mark"
+            self.data.o_bits ^= bit
+        self.data._win = False
+        self.data._lose = False
+        self.data._tie = False
+        self.data._over = False
     
     def generate_successor(self, move: Action) -> 'GameState':
         """
@@ -137,7 +250,8 @@ class GameState:
 
         This method creates a new GameState based on the current state and applies
         the action taken by the agent (placing a mark on the board). It then computes
-        the outcome of the game after this move.
+        the outcome of the game after this move. The successor is built directly from
+        the bitboards with the new mark, instead of cloning the state and applying the action.
         
         Parameters:
         - agent_index: The index of the agent making the move (1 or 2).
@@ -153,18 +267,24 @@ class GameState:
         if self.is_game_over():
             raise Exception('Can\'t generate a successor of a terminal state.')
 
-        # Copy current state
-        state = self.clone()
-        # Apply action
-        state.apply_action(move)
-        return state
+        assert move.pos >= 0 and move.pos <= 8, "Invalid insert location"
+        assert move.agent in [0, 1], "Invalid agent"
+        bit: int = 1 << move.pos
+        data = self.data
+        assert not (data.x_bits | data.o_bits) & bit, "Location is not empty"
+
+        # Build the successor with the mark added to the agent's bitboard
+        if move.agent == 0:
+            return GameState._from_bits(data.x_bits | bit, data.o_bits)
+        return GameState._from_bits(data.x_bits, data.o_bits | bit)
 
     def generate_successors(self, agent_index: int) -> list['GameState']:
         """
         Generate all possible successor states from the current state.
 
         For each legal move available, this method generates a new GameState
-        representing the board after that move has been made.
+        representing the board after that move has been made. The successors are built
+        directly from the bitboards with the new mark, without cloning the state.
         
         Parameters:
         - agent_index: The index of the agent making the move (1 or 2).
@@ -172,16 +292,48 @@ class GameState:
         Returns:
         - list[GameState]: A list of all possible successor game states.
         """
-        return [self.generate_successor(Action(agent=agent_index, pos=pos)) for pos in self.get_legal_moves()]
+        x_bits: int = self.data.x_bits
+        o_bits: int = self.data.o_bits
+        if agent_index == 0:
+            return [GameState._from_bits(x_bits | 1 << pos, o_bits) for pos in self.get_legal_moves()]
+        return [GameState._from_bits(x_bits, o_bits | 1 << pos) for pos in self.get_legal_moves()]
+
+    @classmethod
+    def _from_bits(cls, x_bits: int, o_bits: int) -> 'GameState':
+        """
+        Build a state from its bitboards, computing its outcome.
+        
+        Parameters:
+        - x_bits (int): The bitboard of agent 0 ('X').
+        - o_bits (int): The bitboard of agent 1 ('O').
+        
+        Returns:
+        - GameState: The new state.
+        """
+        data = GameStateData.__new__(GameStateData)
+        data.x_bits = x_bits
+        data.o_bits = o_bits
+        outcome: int = TERMINAL[x_bits << 9 | o_bits]
+        data._win = outcome == 1
+        data._lose = outcome == -1
+        data._tie = outcome == 0
+        data._over = outcome != NOT_TERMINAL
+        state = cls.__new__(cls)
+        state.data = data
+        return state
 
     def clone(self) -> 'GameState':
         """
-        Create a deepcopy of the current state.
+        Create an independent copy of the current state.
+        
+        The board data is copied field by field, which is much cheaper than a deepcopy.
         
         Returns:
-        - GameState: a deepcopy of the state.
+        - GameState: a copy of the state.
         """
-        return deepcopy(self)
+        state = GameState.__new__(GameState)
+        state.data = GameStateData(self.data)
+        return state
     
     def evaluate(self) -> float:
         """
@@ -190,13 +342,9 @@ class GameState:
         Returns:
         - score (float): the score for the game state.
         """
-        if self.is_game_over():
-            if self.is_win():
-                return 1.
-            elif self.is_lose():
-                return -1.
-        
-        return 0.
+        # A single lookup in the precomputed table of the outcomes (non-terminal states score 0)
+        outcome: int = TERMINAL[self.data.x_bits << 9 | self.data.o_bits]
+        return 0. if outcome == NOT_TERMINAL else float(outcome)
 
     def get_reward(self) -> float:
         """
@@ -217,7 +365,7 @@ class TestGameState(unittest.TestCase):
         self.assertFalse(state.is_win())
         self.assertFalse(state.is_lose())
         self.assertFalse(state.is_tie())
-        self.assertEqual(state.get_legal_moves(), list(range(9)))
+        self.assertEqual(state.get_legal_moves(), list(MOVE_ORDER))
 
     def test_win_detection(self):
         """Test that the game correctly identifies a win."""
@@ -251,7 +399,17 @@ class TestGameState(unittest.TestCase):
         state = GameState()
         state.data.squares = [1, 2, 0, 1, 2, 0, 1, 2, 0]  # Some positions filled
         legal_moves = state.get_legal_moves()
-        self.assertEqual(legal_moves, [2, 5, 8])
+        self.assertEqual(legal_moves, [2, 8, 5])  # Corners first
+
+    def test_get_legal_mask(self):
+        """Test that the legal mask matches the legal moves."""
+        state = GameState()
+        state.data.squares = [1, 2, 0, 1, 2, 0, 1, 2, 0]  # Some positions filled
+        self.assertEqual(state.get_legal_mask(), (1 << 2) | (1 << 5) | (1 << 8))
+        self.assertTrue(state.is_legal_move(5))
+        self.assertFalse(state.is_legal_move(4))
+        self.assertFalse(state.is_legal_move(-1))
+        self.assertFalse(state.is_legal_move(9))
 
     def test_generate_successor(self):
         """Test generating a successor state after a move."""
@@ -265,8 +423,107 @@ class TestGameState(unittest.TestCase):
         state = GameState()
         successors = state.generate_successors(0) # Player 1 tests all legal actions
         self.assertEqual(len(successors), 9)
-        for i, successor in enumerate(successors):
-            self.assertEqual(successor.data.squares[i], 1)
+        for pos, successor in zip(MOVE_ORDER, successors):
+            self.assertEqual(successor.data.squares[pos], 1)
+
+    def test_generate_successors_matches_generate_successor(self):
+        """Test that the batch successors are the states built by generate_successor, outcome included."""
+        state = GameState()
+        state.data.squares = [1, 1, 0, 2, 2, 0, 1, 0, 2]
+        state.update()
+        for agent in (0, 1):
+            successors = state.generate_successors(agent)
+            for pos, successor in zip(state.get_legal_moves(), successors):
+                expected = state.generate_successor(Action(agent=agent, pos=pos))
+                self.assertEqual(successor.data, expected.data)
+                self.assertEqual((successor.is_win(), successor.is_lose(), successor.is_tie(), successor.is_game_over()),
+                                 (expected.is_win(), expected.is_lose(), expected.is_tie(), expected.is_game_over()))
+
+    def test_clone(self):
+        """Test that a clone is equal to the state but independent from it."""
+        state = GameState()
+        state.apply_action(Action(agent=0, pos=4))
+        clone = state.clone()
+        self.assertEqual(clone.data, state.data)
+        clone.apply_action(Action(agent=1, pos=0))
+        self.assertNotEqual(clone.data, state.data)
+        self.assertEqual(state.get_legal_moves(), [0, 2, 6, 8, 1, 3, 5, 7])
+
+    def test_undo_action(self):
+        """Test that undoing an action restores the previous state."""
+        state = GameState()
+        state.data.squares = [1, 1, 0, 2, 2, 0, 0, 0, 0]
+        state.update()
+        move = Action(agent=0, pos=2)
+        state.apply_action(move)  # Player 1 wins on top row
+        self.assertTrue(state.is_win())
+        state.undo_action(move)
+        self.assertEqual(state.data.squares, [1, 1, 0, 2, 2, 0, 0, 0, 0])
+        self.assertFalse(state.is_game_over())
+
+    def test_permuted_bits(self):
+        """Test that the bitboard tables apply the board symmetries."""
+        for bits in range(FULL_BOARD + 1):
+            for permutation, table in zip(SYMMETRIES, PERMUTED_BITS):
+                # The transformed board is [squares[p] for p in permutation]: bit i is set if bit p is
+                expected = sum(1 << i for i, p in enumerate(permutation) if bits >> p & 1)
+                self.assertEqual(table[bits], expected)
+
+    def test_canonical_key(self):
+        """Test that the canonical key identifies the boards up to symmetry."""
+        def data_of(squares):
+            data = GameStateData()
+            data.squares = squares
+            return data
+
+        corners = [canonical_key(GameState().generate_successor(Action(agent=0, pos=pos)).data) for pos in (0, 2, 6, 8)]
+        edges = [canonical_key(GameState().generate_successor(Action(agent=0, pos=pos)).data) for pos in (1, 3, 5, 7)]
+        center = canonical_key(GameState().generate_successor(Action(agent=0, pos=4)).data)
+        self.assertEqual(len(set(corners)), 1)
+        self.assertEqual(len(set(edges)), 1)
+        self.assertEqual(len({corners[0], edges[0], center}), 3)
+
+        for squares in [[1, 2, 0, 0, 1, 0, 0, 0, 2], [0, 0, 2, 0, 1, 0, 1, 2, 0], [1, 0, 0, 2, 1, 0, 0, 0, 2]]:
+            images = [data_of([squares[p] for p in permutation]) for permutation in SYMMETRIES]
+            # The images share the key: the smallest of their packed bitboards
+            self.assertEqual({canonical_key(image) for image in images}, {min(hash(image) for image in images)})
+        self.assertNotEqual(canonical_key(data_of([1, 2, 0, 0, 1, 0, 0, 0, 2])), canonical_key(data_of([1, 0, 2, 0, 1, 0, 0, 0, 2])))
+
+    def test_outcome_independent_of_move_order(self):
+        """Test that boards reached through different move orders have the same outcome."""
+        state1 = GameState()
+        for agent, pos in [(0, 0), (1, 3), (0, 1), (1, 4), (0, 2)]:
+            state1.apply_action(Action(agent=agent, pos=pos))
+        state2 = GameState()
+        for agent, pos in [(0, 2), (1, 4), (0, 1), (1, 3), (0, 0)]:
+            state2.apply_action(Action(agent=agent, pos=pos))
+        self.assertTrue(state1.is_win())
+        self.assertTrue(state2.is_win())
+        self.assertFalse(state2.is_lose())
+        self.assertEqual(state1.get_legal_moves(), state2.get_legal_moves())
+
+    def test_apply_action_updates_outcome(self):
+        """Test that apply_action keeps the outcome up to date and undo_action resets it."""
+        state = GameState()
+        for agent, pos in [(0, 0), (1, 4), (0, 8), (1, 2), (0, 1), (1, 6)]:
+            self.assertFalse(state.is_game_over())
+            state.apply_action(Action(agent=agent, pos=pos))
+        self.assertTrue(state.is_lose())
+        self.assertTrue(state.is_game_over())
+        state.undo_action(Action(agent=1, pos=6))
+        self.assertFalse(state.is_game_over())
+        self.assertEqual(state.get_legal_moves(), [6, 3, 5, 7])
+
+    def test_terminal_table(self):
+        """Test that the precomputed outcomes match the winning combinations on every board."""
+        for x_bits in range(FULL_BOARD + 1):
+            for o_bits in range(FULL_BOARD + 1):
+                if x_bits & o_bits:
+                    continue
+                x_wins = any(x_bits & mask == mask for mask in GameStateData.WIN_MASKS)
+                o_wins = any(o_bits & mask == mask for mask in GameStateData.WIN_MASKS)
+                expected = 1 if x_wins else -1 if o_wins else 0 if x_bits | o_bits == FULL_BOARD else NOT_TERMINAL
+                self.assertEqual(TERMINAL[x_bits << 9 | o_bits], expected)
 
     def test_generate_successor_on_terminal_state(self):
         """Test that generating a successor from a terminal state raises an exception."""
@@ -296,39 +553,73 @@ class GameStateData:
         (2, 4, 6),  # Diagonal from top-right to bottom-left
     ]
 
+    # The winning combinations as bit masks over a player's bitboard (bit i = position i),
+    # derived from the list above so that the two cannot disagree.
+    WIN_MASKS: list[int] = [sum(1 << i for i in combination) for combination in winning_combinations]
+
+    __slots__ = ("x_bits", "o_bits", "_win", "_lose", "_tie", "_over")
+
     def __init__(self, prev_state: 'GameStateData | None' = None) -> None:
         """
         Initialize the GameStateData.
         
-        If a previous state is provided, this instance is a deep copy of that state,
+        If a previous state is provided, this instance is an independent copy of that state,
         preserving the game history. Otherwise, it initializes a new game with an empty
         board and default win/lose/tie conditions.
         
         Parameters:
         - prev_state: The previous GameStateData to copy (optional).
         """
-        self.squares: list[int]
+        # The board is stored as one bitboard per player: bit i is set if the player has a mark at position i.
+        self.x_bits: int
+        self.o_bits: int
         self._win: bool
         self._lose: bool
         self._tie: bool
+        self._over: bool  # Cached `_win or _lose or _tie`
         if prev_state is not None:
-            # Deep copy the previous state's data to maintain independent state history
-            self.squares = deepcopy(prev_state.squares)
-            self._win = deepcopy(prev_state._win)
-            self._lose = deepcopy(prev_state._lose)
-            self._tie = deepcopy(prev_state._tie)
+            # Copy the previous state's data to maintain independent state history.
+            # All the fields are immutable (ints and bools), so assigning them is enough.
+            self.x_bits = prev_state.x_bits
+            self.o_bits = prev_state.o_bits
+            self._win = prev_state._win
+            self._lose = prev_state._lose
+            self._tie = prev_state._tie
+            self._over = prev_state._over
         else:
             # Initialize a new game with an empty 3x3 board
-            self.squares = [0] * 9
+            self.x_bits = 0
+            self.o_bits = 0
             self._win = False
             self._lose = False
             self._tie = False
+            self._over = False
     
+    @property
+    def squares(self) -> list[int]:
+        """
+        The board as a list of 9 marks (0 = empty, 1 = 'X', 2 = 'O').
+        
+        This is a copy built from the bitboards: modifying it does not change the board.
+        """
+        return [1 if self.x_bits >> i & 1 else 2 if self.o_bits >> i & 1 else 0 for i in range(9)]
+
+    @squares.setter
+    def squares(self, squares: list[int]) -> None:
+        """Set the board from a list of 9 marks (0 = empty, 1 = 'X', 2 = 'O')."""
+        self.x_bits = 0
+        self.o_bits = 0
+        for i, mark in enumerate(squares):
+            if mark == 1:
+                self.x_bits |= 1 << i
+            elif mark == 2:
+                self.o_bits |= 1 << i
+
     def __eq__(self, other):
         """
         Compare this GameStateData with another for equality.
         
-        Two GameStateData instances are considered equal if their board states (squares)
+        Two GameStateData instances are considered equal if their board states (bitboards)
         are identical.
         
         Parameters:
@@ -337,9 +628,59 @@ class GameStateData:
         Returns:
         - bool: True if the board states are identical, False otherwise.
         """
-        if other is None:
+        if not isinstance(other, GameStateData):
             return False
-        return self.squares == other.squares
+        return self.x_bits == other.x_bits and self.o_bits == other.o_bits
+
+    def __hash__(self) -> int:
+        """
+        Hash the board state, consistently with `__eq__`.
+        
+        The two 9-bit bitboards are packed into a single 18-bit integer: distinct boards never collide.
+        
+        Returns:
+        - int: The packed bitboards.
+        """
+        return (self.x_bits << 9) | self.o_bits
+
+
+# The winning combinations through each position: a move can only complete one of these lines.
+LINES_THROUGH: list[tuple[int, ...]] = [tuple(mask for mask in GameStateData.WIN_MASKS if mask >> pos & 1) for pos in range(9)]
+
+# Whether the marks of a player (a 9-bit bitboard, used as index) complete at least one winning combination.
+WINNING_BOARDS: tuple[bool, ...] = tuple(any(bits & mask == mask for mask in GameStateData.WIN_MASKS) for bits in range(FULL_BOARD + 1))
+
+
+def _build_terminal_table() -> array:
+    """
+    Precompute the outcome of every board, indexed by its packed bitboards `x_bits << 9 | o_bits`.
+
+    Only the 3^9 = 19,683 boards without overlapping marks are filled: for each bitboard of X,
+    every subset of the empty positions is enumerated as the bitboard of O.
+
+    Returns:
+    - array: 1 if 'X' wins, -1 if 'O' wins, 0 for a tie and NOT_TERMINAL otherwise (256 KiB of signed bytes).
+    """
+    table = array("b", [NOT_TERMINAL]) * (1 << 18)
+    for x_bits in range(FULL_BOARD + 1):
+        empty: int = FULL_BOARD & ~x_bits
+        o_bits: int = empty
+        while True:
+            if WINNING_BOARDS[x_bits]:
+                table[x_bits << 9 | o_bits] = 1
+            elif WINNING_BOARDS[o_bits]:
+                table[x_bits << 9 | o_bits] = -1
+            elif x_bits | o_bits == FULL_BOARD:
+                table[x_bits << 9 | o_bits] = 0
+            if o_bits == 0:
+                break
+            o_bits = (o_bits - 1) & empty  # Next subset of the empty positions
+    return table
+
+
+# The outcome of every board, see `_build_terminal_table`: one lookup replaces the checks of the winning combinations.
+NOT_TERMINAL: int = 2
+TERMINAL: array = _build_terminal_table()
 
 
 # Generate with ChatGPT
@@ -356,7 +697,7 @@ class TestGameStateData(unittest.TestCase):
     def test_copy_state(self):
         """Test that copying a GameStateData instance creates a deep copy."""
         state1 = GameStateData()
-        state1.squares[0] = 1
+        state1.x_bits |= 1 << 0
         state1._win = True
         state1._lose = False
         state1._tie = False
@@ -369,7 +710,7 @@ class TestGameStateData(unittest.TestCase):
         self.assertEqual(state2._tie, state1._tie)
 
         # Modify original state and ensure copy does not change
-        state1.squares[1] = 2
+        state1.o_bits |= 1 << 1
         self.assertNotEqual(state2.squares, state1.squares)
 
     def test_equality(self):
@@ -379,12 +720,32 @@ class TestGameStateData(unittest.TestCase):
 
         self.assertEqual(state1, state2)
 
-        state1.squares[0] = 1
+        state1.x_bits |= 1 << 0
         self.assertNotEqual(state1, state2)
 
-        state2.squares[0] = 1
+        state2.x_bits |= 1 << 0
         self.assertEqual(state1, state2)
 
+    def test_squares(self):
+        """Test that the squares view matches the bitboards, both ways."""
+        state = GameStateData()
+        state.squares = [1, 2, 0, 0, 1, 0, 0, 0, 2]
+        self.assertEqual(state.x_bits, (1 << 0) | (1 << 4))
+        self.assertEqual(state.o_bits, (1 << 1) | (1 << 8))
+        self.assertEqual(state.squares, [1, 2, 0, 0, 1, 0, 0, 0, 2])
+
+    def test_hash(self):
+        """Test that equal GameStateData instances have the same hash and can be used as dict keys."""
+        state1 = GameStateData()
+        state2 = GameStateData()
+        state1.x_bits |= 1 << 4
+        state2.x_bits |= 1 << 4
+        self.assertEqual(hash(state1), hash(state2))
+        self.assertEqual(len({state1, state2}), 1)
+
+        state2.o_bits |= 1 << 0
+        self.assertNotEqual(hash(state1), hash(state2))
+
     def test_equality_with_none(self):
         """Test that comparing a GameStateData instance with None returns False."""
         state = GameStateData()
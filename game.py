@@ -11,8 +11,8 @@ The game can be run in a non-GUI mode,
 This module is intended for games that are fully autonomous, with agents providing all game input.
 """
 from engine import GameState, Action
-from controller import Controller
-from gui import View
+from controller import Controller, HumanController
+from gui import View, GUIView
 
 
 class GameController:
@@ -31,7 +31,15 @@ class GameController:
         - view (View): The view object responsible for rendering the game (CLI or GUI).
         - player1 (Controller): The controller for player 1 (e.g., human or AI).
         - player2 (Controller): The controller for player 2 (e.g., human or AI).
+
+        Raises:
+        - ValueError: If a human plays without the GUI view, the only one receiving the mouse clicks
+          (the game would wait for a click forever).
         """
+        for player in (player1, player2):
+            if isinstance(player, HumanController) and not isinstance(view, GUIView):
+                raise ValueError(f"A human player needs the GUI view to click on the board, got {type(view).__name__}")
+
         self.model: GameState = model  # The game state model (board and game logic)
         self.view: View = view  # The view responsible for rendering the game state
         self.player1_controller: Controller = player1  # Controller for player 1 (X)
@@ -41,6 +49,21 @@ class GameController:
         
         self.num_moves: int = 0  # Track the total number of moves made in the game
         self.move_history: list[Action] = []  # A list storing the history of moves, useful for tracking and debugging
+
+    def reset(self, model: GameState) -> None:
+        """
+        Reset the GameController for a new game between the same players, with the same view.
+
+        Reusing the controller across games (e.g., in a tournament) avoids building a new one per game:
+        the move history list is cleared in place instead of being reallocated.
+
+        Parameters:
+        - model (GameState): The initial game state of the new game.
+        """
+        self.model = model
+        self.current_turn = 1  # Player 1 (X) always starts
+        self.num_moves = 0
+        self.move_history.clear()
     
     def game_loop(self) -> None:
         """
@@ -49,23 +72,17 @@ class GameController:
         """
         # Continue looping until the game reaches a terminal state (win, draw)
         while not self.model.is_game_over():
-            # Optionally, you can print the current move number for debugging
-            print(f"Turn {self.num_moves}")
-            
-            # Clone the previous game state to check if it changes after a move
-            prev_state: GameState = self.model.clone()
+            # Poll the input events once per frame
+            events = self.view.get_events()
 
-            if self.current_turn == 1:
-                # If it's player 1's turn, process their input
-                self.player1_controller.process_inputs(self.model, self.move_history)
-            else:
-                # If it's player 2's turn, process their input
-                self.player2_controller.process_inputs(self.model, self.move_history)
+            # Process the input of the player whose turn it is
+            controller: Controller = self.player1_controller if self.current_turn == 1 else self.player2_controller
+            moved: bool = controller.process_inputs(self.model, self.move_history, events)
             
-            # If the game state has changed, switch turns and increment the move count
-            if self.model.data != prev_state.data:
-                # Toggle the turn: if it was player 1's turn, switch to player 2, and vice versa
-                self.current_turn = 2 if self.current_turn == 1 else 1
+            # If a move was applied, switch turns and increment the move count
+            if moved:
+                # Toggle the turn: 1 ^ 3 = 2 and 2 ^ 3 = 1
+                self.current_turn ^= 3
                 self.num_moves += 1  # Increment the move counter
             
             # Render the current game state using the view
@@ -1,16 +1,37 @@
 import pygame
 import os
+import sys
+from functools import lru_cache
 from engine import GameState
 from utils import get_image, get_board_matrix
 from settings import *
 
 
+@lru_cache(maxsize=16)
+def get_display_image(path: str) -> pygame.Surface:
+    """
+    Return the image at the given path converted to the display's pixel format.
+    
+    Each image is read from disk and converted once (the display must be created first),
+    then blitting it does not convert its pixels again.
+    
+    Parameters:
+    - path(str): the path of the image, relative to the project directory.
+    """
+    image = get_image(path)
+    return image.convert_alpha() if image.get_flags() & pygame.SRCALPHA else image.convert()
+
+
 class View:
     """Abstract class for View, which defines a display method."""
     def display(self, state: GameState) -> None:
         """Display the game state, this method must be implemented by subclasses."""
         raise NotImplementedError("Abstract class")
 
+    def get_events(self) -> list[pygame.event.Event]:
+        """Return the input events of the current frame (none for views without a window)."""
+        return []
+
 
 class NoView(View):
     """No View: A placeholder view that performs no rendering."""
@@ -21,29 +42,31 @@ class NoView(View):
 
 class TextView(View):
     """CLI View: A text-based view for rendering the game state."""
+    def __init__(self) -> None:
+        self._last_board: int | None = None  # The board printed last (packed bitboards), to print each board once
+
     def display(self, state: GameState) -> None:
         """
         Display the game state in a text-based format.
         
+        Nothing is printed if the board has not changed since the last call.
+        
         Parameters:
         - state(GameState): the state to render.
         """
-        to_print: str = ""
-        for i in range(3):
-            to_print += "|"  # Begin each row with a vertical bar
-            for j in range(3):
-                mark: str
-                # Determine which mark to display in each cell
-                if state.data.squares[i + 3 * j] == 1:
-                    mark = "X" 
-                elif state.data.squares[i + 3 * j] == 2:
-                    mark = "O"
-                else:
-                    mark = " "
-                to_print += " " + mark + " " + "|"  # Add the mark and another vertical bar
-            to_print += "\n"  # Move to the next line after each row
+        board: int = hash(state.data)  # The packed bitboards
+        if board == self._last_board:
+            return
+        self._last_board = board
+
+        x_bits: int = state.data.x_bits
+        o_bits: int = state.data.o_bits
+        # The mark of each position: pos = 3 * column + row, like in the GUI
+        marks: list[str] = ["X" if x_bits >> pos & 1 else "O" if o_bits >> pos & 1 else " " for pos in range(9)]
+        # Row i holds the positions i, i + 3 and i + 6
+        rows: list[str] = [f"| {marks[i]} | {marks[i + 3]} | {marks[i + 6]} |" for i in range(3)]
         
-        print(to_print)  # Print the entire board to the terminal
+        print("\n".join(rows) + "\n")  # Print the entire board to the terminal
 
         if state.is_game_over():
             print("Game over!")
@@ -58,10 +81,18 @@ class TextView(View):
 
 class GUIView(View):
     """GUI View: A graphical view for rendering the game state using Pygame."""
+
+    # The only events the game reacts to: closing the window and clicking on a case
+    INPUT_EVENTS: list[int] = [pygame.QUIT, pygame.MOUSEBUTTONDOWN]
+
     def __init__(self) -> None:
         # Pygame Init
         pygame.init()
 
+        # Events: drop every other event (mouse motion, keys, ...) before it reaches the queue
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(self.INPUT_EVENTS)
+
         # Screen
         self.GAME_W: int = GAME_W
         self.GAME_H: int = GAME_H
@@ -73,62 +104,74 @@ class GUIView(View):
         self.FPS: int = FPS
         self.clock = pygame.time.Clock()
 
+        self._last_board: int | None = None  # The board drawn last (packed bitboards), to draw each board once
+
+        # Images: loaded and converted to the screen's pixel format once, scaled here, then only blitted each frame
+        tile_size = int(self.GAME_H / 4)  # Dimensions for 'x' and 'o' marks
+        self._board: pygame.Surface = pygame.transform.scale(
+            get_display_image(os.path.join("img", "board.png")), (self.GAME_W, self.GAME_H)
+        )
+        self._cross: pygame.Surface = pygame.transform.scale(
+            get_display_image(os.path.join("img", "cross.png")), (tile_size, tile_size)
+        )
+        self._circle: pygame.Surface = pygame.transform.scale(
+            get_display_image(os.path.join("img", "circle.png")), (tile_size, tile_size)
+        )
+        # Top-left corner of the mark of each case, indexed by position (pos = 3 * x + y)
+        self._cell_xy: list[tuple[float, float]] = [
+            ((self.GAME_W / 3.1) * x + (self.GAME_W / 17), (self.GAME_W / 3.145) * y + (self.GAME_H / 19))
+            for x in range(3) for y in range(3)
+        ]
+
+    def get_events(self) -> list[pygame.event.Event]:
+        """
+        Drain the pygame event queue once for the current frame.
+        
+        Closing the window quits the game. The other events are returned for the controllers.
+        
+        Returns:
+        - list[pygame.event.Event]: the events of the frame.
+        """
+        events = pygame.event.get(self.INPUT_EVENTS)
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.quit()  # Close the pygame window
+                sys.exit()  # Exit the program
+        return events
+
     def display(self, state: GameState) -> None:
         """
         Display the game state graphically using Pygame.
         
+        The screen is only redrawn when the board has changed since the last call
+        (e.g., not while waiting for a human player to click).
+        
         Parameters:
         - state(GameState): the state to render.
         """
-        screen_height = self.GAME_H
-        screen_width = self.GAME_W
-
-        # Setup dimensions for 'x' and 'o' marks
-        tile_size = int(screen_height / 4)
-
-        # Load and blit the board image for the game
-        board_img = get_image(os.path.join("img", "board.png"))
-        board_img = pygame.transform.scale(
-            board_img, (int(screen_width), int(screen_height))
-        )
-
-        self.game_canvas.blit(board_img, (0, 0))
-
-        # Load and blit actions for the game
-        def getSymbol(input):
-            if input == 0:
-                return None
-            elif input == 1:
-                return "cross"
-            else:
-                return "circle"
-
-        board_state = list(map(getSymbol, state.data.squares))
-
-        mark_pos = 0
-        for x in range(3):
-            for y in range(3):
-                mark = board_state[mark_pos]
-                mark_pos += 1
-
-                if mark is None:
-                    continue
-
-                mark_img = get_image(os.path.join("img", mark + ".png"))
-                mark_img = pygame.transform.scale(mark_img, (tile_size, tile_size))
-
-                self.game_canvas.blit(
-                    mark_img,
-                    (
-                        (screen_width / 3.1) * x + (screen_width / 17),
-                        (screen_width / 3.145) * y + (screen_height / 19),
-                    ),
-                )
-
-        self.screen.blit(pygame.transform.scale(self.game_canvas,
-                                                (self.SCREEN_W, self.SCREEN_H)),
-                                                (0, 0))
+        board: int = hash(state.data)  # The packed bitboards
+        if board == self._last_board:
+            self.clock.tick(self.FPS)
+            return
+        self._last_board = board
+
+        # Blit the board image for the game
+        self.game_canvas.blit(self._board, (0, 0))
+
+        # Blit actions for the game
+        x_bits: int = state.data.x_bits
+        o_bits: int = state.data.o_bits
+        for pos, cell_xy in enumerate(self._cell_xy):
+            if x_bits >> pos & 1:
+                self.game_canvas.blit(self._cross, cell_xy)
+            elif o_bits >> pos & 1:
+                self.game_canvas.blit(self._circle, cell_xy)
+
+        # The canvas has the size of the screen: blit it as is
+        self.screen.blit(self.game_canvas, (0, 0))
         pygame.display.update()
+
+        # The final board is drawn once, so the outcome is printed once
         if state.is_game_over():
             print("Game over!")
         if state.is_win():
@@ -1,107 +1,419 @@
+import math
 import numpy as np
 import random
-from engine import GameState, Action
+import unittest
+from array import array
+from engine import GameState, GameStateData, FULL_BOARD, MOVES_OF_MASK, WINNING_BOARDS
+
+# Winning lines as an (8, 3) index array, to check all lines of a batch of boards at once
+WIN_LINES: np.ndarray = np.array(GameStateData.winning_combinations)
+# The bit of each square in a bitboard
+SQUARE_SHIFTS: np.ndarray = np.arange(9)
+
+# Proven values of the nodes (MCTS-Solver), for the agent who played the move leading to the node
+UNKNOWN: int = 0
+WIN: int = 1
+LOSS: int = -1
+DRAW: int = 2
+
+# UCB1 exploration factors for visit counts below SQRT_TABLE_SIZE: SQRT_LOG[n] = sqrt(log(n)) and
+# INV_SQRT[n] = 1/sqrt(n) (0 for n = 0, never read). Typed arrays of doubles: indexing one returns a
+# Python float, which is cheaper than a NumPy scalar in the scalar arithmetic of the selection.
+SQRT_TABLE_SIZE: int = 1 << 17
+SQRT_LOG: array = array("d", np.sqrt(np.log(np.arange(1, SQRT_TABLE_SIZE, dtype=np.float64))).tobytes())
+SQRT_LOG.insert(0, 0.)
+INV_SQRT: array = array("d", (1. / np.sqrt(np.arange(1, SQRT_TABLE_SIZE, dtype=np.float64))).tobytes())
+INV_SQRT.insert(0, 0.)
 
 
 class Node:
+    __slots__ = ("state", "parent", "children", "visits", "wins", "pos", "virtual_loss", "expanded", "proven")
+
     def __init__(self, state: GameState, parent: 'Node | None' = None, pos: int | None = None) -> None:
         self.state: GameState = state
         self.parent = parent
         self.children: list['Node'] = []
         self.visits: int = 0
-        self.wins: int = 0
+        self.wins: float = 0.  # Sum of the results for the agent who played the move leading to this node
         self.pos = pos
-    
+        self.virtual_loss: int = 0  # Pending simulations of the current batch going through this node
+        self.expanded: bool = False  # Whether the children of all the legal moves have been created
+        self.proven: int = UNKNOWN  # The game-theoretic value of the node once it is known (WIN, LOSS or DRAW)
+
     def add_child(self, child_state: GameState, pos: int) -> 'Node':
         child: Node = Node(child_state, self, pos)
         self.children.append(child)
         return child
-    
-    def update(self, result: int) -> None:
+
+    def update(self, result: float) -> None:
         self.visits += 1
         self.wins += result
-    
+
     def is_fully_expanded(self) -> bool:
-        return self.state.is_game_over()
-    
+        return self.expanded
+
     def best_child(self, c: float = 1.414) -> 'Node':
-        best_score: float = -np.inf
-        best_child = self
-        for child in self.children:
-            score: float = float(child.wins)/float(child.visits) + c * np.sqrt(np.log(self.visits)/child.visits)
-            if score > best_score:
-                best_score = score
-                best_child = child
-        
-        return best_child
+        # A move proven to lose is never selected
+        children: list['Node'] = [child for child in self.children if child.proven != LOSS]
+        if not children:
+            return self
+        if c == 0:
+            return max(children, key=lambda child: child.visits)  # Exploit: the most visited child
+
+        for child in children:
+            if child.visits + child.virtual_loss == 0:
+                return child  # A child never selected has an infinite score: children are tried in order first
+
+        # Pending simulations count as losses, which steers the rest of the batch towards other paths.
+        # The argmax runs in the max builtin, and the exploration factors are read from the tables.
+        parent_visits: int = self.visits + self.virtual_loss
+        if parent_visits < SQRT_TABLE_SIZE:
+            # The children have no more visits than their parent: they are in the tables too
+            c_sqrt_log: float = c * SQRT_LOG[parent_visits]
+            return max(children, key=lambda child: (child.wins - child.virtual_loss) / (child.visits + child.virtual_loss)
+                       + c_sqrt_log * INV_SQRT[child.visits + child.virtual_loss])
+        log_visits: float = math.log(parent_visits)
+        return max(children, key=lambda child: (child.wins - child.virtual_loss) / (child.visits + child.virtual_loss)
+                   + c * math.sqrt(log_visits / (child.visits + child.virtual_loss)))
 
 
 def mcts_simulate(state: GameState, start_index: int) -> float:
-    current_state: GameState = state.clone()
-    index: int = start_index
-    while not current_state.is_game_over():
-        possibles_moves = current_state.get_legal_moves()
-        move = random.choice(possibles_moves)
-        action = Action(agent=index, pos=move)
-        current_state = current_state.generate_successor(action)
-        index = 1 if index == 0 else 1
+    if state.is_game_over():
+        return state.evaluate()
+    return mcts_rollout(state.data.x_bits, state.data.o_bits, start_index)
+
 
-    return current_state.evaluate()
+def mcts_rollout(x_bits: int, o_bits: int, index: int) -> float:
+    """
+    Play a random game from a non-terminal board, on the bitboards only.
+
+    No state is cloned or generated per ply: the moves are read from the precomputed table of
+    the empty positions, and the outcome from the precomputed table of the winning bitboards.
+
+    Parameters:
+    - x_bits (int): The bitboard of agent 0 ('X').
+    - o_bits (int): The bitboard of agent 1 ('O').
+    - index (int): The agent to play first.
+
+    Returns:
+    - float: The evaluation of the final state (1 = 'X' wins, -1 = 'O' wins, 0 = tie).
+    """
+    while True:
+        # Draw a move uniformly: indexing with random() is cheaper than random.choice or random.randrange
+        moves = MOVES_OF_MASK[FULL_BOARD & ~(x_bits | o_bits)]
+        move = moves[int(random.random() * len(moves))]
+        if index == 0:
+            x_bits |= 1 << move
+            if WINNING_BOARDS[x_bits]:
+                return 1.
+        else:
+            o_bits |= 1 << move
+            if WINNING_BOARDS[o_bits]:
+                return -1.
+        if x_bits | o_bits == FULL_BOARD:
+            return 0.
+        index ^= 1  # The other agent plays next
+
+
+def mcts_simulate_leaves(states: list[GameState], start_indices: list[int], rollouts: int) -> np.ndarray:
+    """
+    Play `rollouts` random games from each of the states, all at once with NumPy, and return their average outcomes.
+
+    Each rollout fills the empty squares in a random order, alternating the agents. The game
+    ends when a line is first completed, so the winner is the owner of the line completed
+    at the earliest ply (or nobody if no line is completed). A line completed before the
+    rollout (terminal state) counts as completed at ply -1, so terminal states keep their outcome.
+
+    Parameters:
+    - states (list[GameState]): The states to simulate from, e.g. the leaves of a batch.
+    - start_indices (list[int]): The agent to play first in each state.
+
+    Returns:
+    - np.ndarray: The average evaluation of the final states of each state (1 = 'X' wins, -1 = 'O' wins, 0 = tie).
+    """
+    # The boards as flat arrays of bitboards, unpacked into squares (0 = empty, 1 = 'X', 2 = 'O') with one shift per square
+    x_bits = np.array([state.data.x_bits for state in states])[:, None]
+    o_bits = np.array([state.data.o_bits for state in states])[:, None]
+    squares = (x_bits >> SQUARE_SHIFTS & 1) + 2 * (o_bits >> SQUARE_SHIFTS & 1)
+    boards = np.repeat(squares.astype(np.int8), rollouts, axis=0)
+    starts = np.repeat(np.array(start_indices, dtype=np.int8), rollouts)[:, None]
+    filled = boards != 0
+    rows = np.arange(len(boards))[:, None]
+
+    # plies[b, i]: the ply at which square i is filled in rollout b (negative if it was already filled).
+    # Filled squares get a key of -1, so a random order of the keys plays the empty squares after them.
+    keys = np.random.random(boards.shape)
+    keys[filled] = -1.
+    plies = np.empty(boards.shape, dtype=np.int64)
+    plies[rows, np.argsort(keys, axis=1)] = np.arange(9)
+    plies -= filled.sum(axis=1, keepdims=True)
+
+    # The mark of each square at the end of the rollout (1 = 'X', 2 = 'O'): the start agent plays the even plies
+    boards = np.where(filled, boards, np.where(plies % 2 == 0, starts + 1, 2 - starts))
+
+    # The boards are full, so a line is completed if its three marks are equal. The completion
+    # ply of a line is the last ply among its squares (-1 if they were all filled before the rollout).
+    lines = boards[:, WIN_LINES]
+    completed = (lines[:, :, 0] == lines[:, :, 1]) & (lines[:, :, 1] == lines[:, :, 2])
+    completion_ply = np.where(completed, plies[:, WIN_LINES].max(axis=2).clip(min=-1), 9)
+    first_line = completion_ply.argmin(axis=1)
+    winner = np.where(completion_ply[rows[:, 0], first_line] < 9, lines[rows[:, 0], first_line, 0], 0)
+
+    outcomes = (winner == 1).astype(float) - (winner == 2)
+    return outcomes.reshape(len(states), rollouts).mean(axis=1)
 
 
 def mcts_expand(node: Node, index: int) -> Node:
     """
-    Expand the node by creating a new child node for one of the unvisited legal moves.
-    
+    Expand the node by creating the child nodes of all its legal moves at once.
+
+    Parameters:
+    - index (int): The agent to play in the node's state.
+
+    Returns:
+    - Node: The first child node (the first legal move, see `get_legal_moves`).
+    """
+    if node.expanded:
+        raise Exception('The node is already expanded.')
+    if node.state.is_game_over():
+        raise Exception('No legal moves to expand.')
+
+    for pos, new_state in zip(node.state.get_legal_moves(), node.state.generate_successors(index)):
+        child = node.add_child(child_state=new_state, pos=pos)
+        if new_state.is_game_over():
+            # A terminal child is solved: the move wins for the agent who played it, or ties
+            child.proven = DRAW if new_state.is_tie() else WIN
+    node.expanded = True
+    mcts_prove(node)
+    return node.children[0]
+
+
+def mcts_prove(node: Node) -> None:
+    """
+    Propagate the proven values of the children of the node up the tree (MCTS-Solver).
+
+    The children's moves are played by the agent to move in the node. The node is a proven loss
+    (for the agent who moved into it) if one of its children is a proven win, a proven win
+    if all its children are proven losses, and a proven draw if all its children are proven
+    draws or losses. Its parent is then checked in turn.
+    """
+    while node is not None and node.expanded and node.proven == UNKNOWN:
+        proven_values = [child.proven for child in node.children]
+        if WIN in proven_values:
+            node.proven = LOSS
+        elif UNKNOWN in proven_values:
+            return
+        elif DRAW in proven_values:
+            node.proven = DRAW
+        else:
+            node.proven = WIN
+        node = node.parent
+
+
+def mcts_select(root: Node, index: int, c: float) -> tuple[Node, int]:
+    """
+    Select a leaf to simulate from: descend the tree through the best children, down to a child
+    that has never been simulated, or to a node that is not expanded yet, which is then expanded.
+    The descent also stops at a proven node, whose value is known without simulation.
+
+    A virtual loss is added to every node on the path, and removed by `mcts_backpropagate`.
+
+    Parameters:
+    - index (int): The agent to play in the root's state.
+
     Returns:
-    - Node: The newly added child node.
-    """
-    legal_moves = node.state.get_legal_moves()
-    
-    # Generate successors for unexpanded moves
-    for move in legal_moves:
-        new_state = node.state.generate_successor(Action(agent=index, pos=move))
-        child_node = node.add_child(child_state=new_state, pos=move)
-        return child_node
-    
-    raise Exception('No legal moves left to expand.')
-    
-
-def mcts_backpropagate(node: Node, result: int) -> None:
-    """
-    Backpropagate the result of a simulation up the tree, updating the visits and wins.
-    
+    - tuple[Node, int]: The selected node and the agent to play in its state.
+    """
+    node = root
+    node.virtual_loss += 1
+    while node.proven == UNKNOWN and not node.state.is_game_over():
+        if not node.is_fully_expanded():
+            # Expansion: all the children are created, the first one is the leaf
+            node = mcts_expand(node=node, index=index)
+            node.virtual_loss += 1
+            return node, 1 - index
+        node = node.best_child(c=c)
+        node.virtual_loss += 1
+        index = 1 - index
+        if node.visits == 0:
+            return node, index  # A child created by an earlier expansion but never simulated is the leaf
+    return node, index
+
+
+def mcts_backpropagate(node: Node, result: float) -> None:
+    """
+    Backpropagate the result of a simulation up the tree, updating the visits and wins,
+    and removing the virtual loss added by the selection.
+
     Parameters:
-    - result (int): The outcome of the simulation. 1 for a win, -1 for a loss, 0 for a tie.
+    - result (float): The outcome of the simulation for the agent who played the move leading to the node.
+      1 for a win, -1 for a loss, 0 for a tie (or the average outcome of several rollouts).
     """
     while node is not None:
         node.visits += 1
-        if result == 1:
-            node.wins += 1
-        elif result == -1:
-            node.wins -= 1  # You may need to adjust this based on how you're handling wins/losses
+        node.virtual_loss -= 1
+        node.wins += result
+        # The parent's move was played by the other agent
+        result = -result
         # Move up to the parent node
         node = node.parent
 
 
-def monte_carlo_tree_search(root: Node, iterations: int, index: int, c: float) -> Node:
-    for i in range(iterations):
-        node = root
-        # Selection: Traverse the tree to the best child
-        while not node.state.is_game_over():
-            if not node.is_fully_expanded():
-                node = mcts_expand(node=node, index=index)
+def monte_carlo_tree_search(root: Node, iterations: int, index: int, c: float, batch_size: int = 1, rollouts: int = 1) -> Node:
+    """
+    Run the Monte Carlo Tree Search from the root.
+
+    Simulations are run by batches: `batch_size` leaves are selected first (virtual losses keep
+    them apart), then simulated, then backpropagated. With `rollouts` > 1, each simulation
+    averages that many random games, and the games of all the leaves of a batch are played at once with NumPy.
+
+    The search stops early once the value of the root is proven (MCTS-Solver): the simulations
+    cannot change the move to play anymore.
+
+    Parameters:
+    - index (int): The agent to play in the root's state.
+
+    Returns:
+    - Node: The best child of the root.
+    """
+    done: int = 0
+    while done < iterations and root.proven == UNKNOWN:
+        # Selection: Traverse the tree to the best leaves
+        leaves = [mcts_select(root=root, index=index, c=c) for _ in range(min(batch_size, iterations - done))]
+        # Simulation: Simulate the game starting from each leaf's state (all the leaves at once with NumPy)
+        if rollouts > 1:
+            results = mcts_simulate_leaves([node.state for node, _ in leaves], [node_index for _, node_index in leaves], rollouts).tolist()
+        else:
+            results = [mcts_simulate(node.state, start_index=node_index) for node, node_index in leaves]
+        for (node, node_index), result in zip(leaves, results):
+            # Backpropagation: Update the nodes along the path, from the point of view of the agent who moved last
+            if node_index == 0: result *= -1
+            if node.proven != UNKNOWN:
+                result = 0. if node.proven == DRAW else float(node.proven)  # The exact value replaces the rollouts
+            mcts_backpropagate(node=node, result=result)
+        done += len(leaves)
+
+    # Return the best move (child) after the iterations: a proven win if there is one
+    for child in root.children:
+        if child.proven == WIN:
+            return child
+    best_child = root.best_child(c=0)  # c=0 to select the most visited child (exploit)
+    if best_child is root:
+        # All the moves are proven losses: play the most resistant one
+        best_child = max(root.children, key=lambda child: child.visits)
+    return best_child
+
+
+def mcts_root_visits(state: GameState, iterations: int, index: int, c: float, batch_size: int, rollouts: int, seed: int) -> dict[int, int]:
+    """
+    Grow an independent tree from the state and return the visits of the root's children.
+
+    This is the job of one worker in a root-parallel search: the visits returned by
+    the workers are summed to choose the move.
+
+    Parameters:
+    - index (int): The agent to play in the state.
+    - seed (int): The seed of the worker's random generator.
+
+    Returns:
+    - dict[int, int]: The number of visits of each move (position) of the root.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    root: Node = Node(state=state)
+    best_child: Node = monte_carlo_tree_search(root=root, iterations=iterations, index=index, c=c, batch_size=batch_size, rollouts=rollouts)
+    if best_child.proven == WIN:
+        # The search stopped on a proven win: it gets all the simulations so that it is chosen
+        return {best_child.pos: iterations}
+    if root.proven == WIN:
+        # All the moves are proven losses: keep their visits, the most resistant one is chosen
+        return {child.pos: child.visits for child in root.children}
+    return {child.pos: child.visits for child in root.children if child.proven != LOSS}
+
+
+class TestMCTS(unittest.TestCase):
+
+    @staticmethod
+    def state_of(x_positions: list[int], o_positions: list[int]) -> GameState:
+        """The state with the marks of X and O at the given positions."""
+        state = GameState()
+        state.data.squares = [1 if pos in x_positions else 2 if pos in o_positions else 0 for pos in range(9)]
+        state.update()
+        return state
+
+    @staticmethod
+    def exact_rollout_value(x_bits: int, o_bits: int, index: int) -> float:
+        """The expected outcome of a uniformly random game from a non-terminal board, by enumerating all the games."""
+        moves = MOVES_OF_MASK[FULL_BOARD & ~(x_bits | o_bits)]
+        total: float = 0.
+        for move in moves:
+            if index == 0:
+                new_x, new_o = x_bits | 1 << move, o_bits
+                won = WINNING_BOARDS[new_x]
             else:
-                node = node.best_child(c=c)        
-        # Simulation: Simulate the game starting from this node's state
-        result = mcts_simulate(node.state, start_index=index)
-        # Backpropagation: Update the nodes along the path
-        if index == 1: result *= -1
-        mcts_backpropagate(node=node, result=int(result))
-        
-    
-    # Return the best move (child) after the iterations
-    return root.best_child(c=0)  # c=0 to select the most visited child (exploit)
+                new_x, new_o = x_bits, o_bits | 1 << move
+                won = WINNING_BOARDS[new_o]
+            if won:
+                total += 1. if index == 0 else -1.
+            elif new_x | new_o != FULL_BOARD:
+                total += TestMCTS.exact_rollout_value(new_x, new_o, 1 - index)
+        return total / len(moves)
+
+    def setUp(self):
+        random.seed(0)
+        np.random.seed(0)
+
+    def test_solver_plays_winning_move(self):
+        """Test that a winning move is proven on expansion and stops the search at once."""
+        state = self.state_of([0, 1], [4, 5])  # X wins on 2
+        for rollouts in (1, 16):
+            root = Node(state=state)
+            best = monte_carlo_tree_search(root=root, iterations=1000, index=0, c=1.4, batch_size=8, rollouts=rollouts)
+            self.assertEqual(best.pos, 2)
+            self.assertEqual(best.proven, WIN)
+            self.assertEqual(root.proven, LOSS)
+            self.assertLess(root.visits, 1000)
+            self.assertEqual(mcts_root_visits(state, 1000, 0, 1.4, 8, rollouts, seed=0), {2: 1000})
+
+    def test_solver_lost_position(self):
+        """Test that a position where all the moves are proven losses still returns a legal move."""
+        state = self.state_of([0, 1, 3], [4, 8])  # X threatens 2 and 6, O can only block one
+        for rollouts in (1, 16):
+            root = Node(state=state)
+            best = monte_carlo_tree_search(root=root, iterations=2000, index=1, c=1.4, batch_size=8, rollouts=rollouts)
+            self.assertIn(best.pos, state.get_legal_moves())
+            self.assertEqual(root.proven, WIN)
+            self.assertTrue(all(child.proven == LOSS for child in root.children))
+            visits = mcts_root_visits(state, 2000, 1, 1.4, 8, rollouts, seed=0)
+            self.assertTrue(visits)
+            self.assertTrue(set(visits) <= set(state.get_legal_moves()))
+
+    def test_mcts_prove_draw(self):
+        """Test that a node whose children are all proven draws or losses is a proven draw."""
+        state = self.state_of([0, 2, 3, 7], [1, 4, 6, 8])  # X to move on 5: a tie
+        root = Node(state=state)
+        mcts_expand(root, 0)
+        self.assertEqual([child.proven for child in root.children], [DRAW])
+        self.assertEqual(root.proven, DRAW)
+
+    def test_simulate_leaves_expected_value(self):
+        """Test that the batched NumPy rollouts and the scalar rollouts both estimate the exact expected outcome."""
+        states = [(GameState(), 0), (self.state_of([4], [0]), 0), (self.state_of([0, 4], [8]), 1), (self.state_of([0, 1], [4, 5]), 1)]
+        samples: int = 20000
+        estimates = mcts_simulate_leaves([state for state, _ in states], [index for _, index in states], samples)
+        for (state, index), estimate in zip(states, estimates):
+            exact = self.exact_rollout_value(state.data.x_bits, state.data.o_bits, index)
+            scalar = sum(mcts_rollout(state.data.x_bits, state.data.o_bits, index) for _ in range(samples)) / samples
+            # The outcomes are in [-1, 1]: the standard error of the means is below 1 / sqrt(samples) ~ 0.007
+            self.assertAlmostEqual(estimate, exact, delta=0.04)
+            self.assertAlmostEqual(scalar, exact, delta=0.04)
 
+    def test_simulate_leaves_terminal_state(self):
+        """Test that a terminal state keeps its outcome in the batched rollouts."""
+        won = self.state_of([0, 1, 2], [4, 5])
+        lost = self.state_of([0, 1, 6], [3, 4, 5])
+        self.assertEqual(list(mcts_simulate_leaves([won, lost], [1, 0], 8)), [1., -1.])
 
 
+if __name__ == '__main__':
+    unittest.main()
@@ -1,32 +1,282 @@
-import numpy as np
-
-def alpha_beta_search(state, max_p: bool) -> float:
-    v: float = minimax(state, alpha=-np.inf, beta=np.inf, max_p=max_p)
-    return v
-
-
-def minimax(state, alpha: float, beta: float, max_p: bool) -> float:
-    """"""
-    if state.is_win():
-        return 1.
-    elif state.is_lose():
-        return -1.
-    elif state.is_tie():
-        return 0.
-    v: float
+import math
+import unittest
+from engine import GameState, Action, canonical_key, MOVES_OF_MASK, WINNING_BOARDS, FULL_BOARD
+
+# Transposition table flags: the stored value is exact, a lower bound or an upper bound.
+# The search always runs to the end of the game, so entries do not need a depth.
+EXACT: int = 0
+LOWER: int = 1
+UPPER: int = 2
+
+# Transposition table shared by the searches of all the controllers (key -> (flag, value)).
+# The values are the exact game values (or bounds on them) of the positions, which do not depend
+# on who searches them, so the table stays valid across moves, games and players.
+SHARED_TT: dict[int, tuple[int, float]] = {}
+
+# Best move of every position reachable in a game (X moving first), keyed by the packed bitboards
+# of the board and the player to move, filled on first use by `precompute_best_moves`.
+BEST_MOVES: dict[int, int] = {}
+
+
+def alpha_beta_search(state, max_p: bool, alpha: float = -math.inf, beta: float = math.inf,
+                      tt: dict[int, tuple[int, float]] | None = None) -> float:
+    # Negamax values are relative to the player to move: convert the window and the value for player 1 (O)
     if max_p:
-        v = -np.inf
-        for successor in state.generate_successors(0):
-            v = max(v, minimax(successor, alpha, beta, False))
-            if v >= beta:
-                return v
-            alpha = max(alpha, v)
-        return v
-    else:
-        v = np.inf
-        for successor in state.generate_successors(1):
-            v = min(v, minimax(successor, alpha, beta, True))
-            if v <= alpha:
-                return v
-            beta = min(beta, v)
-        return v
+        return negamax(state, alpha=alpha, beta=beta, color=1., tt=tt)
+    return -negamax(state, alpha=-beta, beta=-alpha, color=-1., tt=tt)
+
+
+def precompute_best_moves() -> dict[int, int]:
+    """
+    Solve every position reachable in a game and store its best move in BEST_MOVES.
+
+    The positions are enumerated breadth-first from the empty board (X moving first). The best
+    move of a position is the first of its legal moves (center, corners, edges) with the best
+    value for the player to move, the move an alpha-beta search at the root would choose.
+    Tic-tac-toe has 4,520 non-terminal reachable positions, solved in a fraction of a second
+    with the shared transposition table: afterwards, a minimax move is a single lookup.
+
+    Returns:
+    - dict[int, int]: BEST_MOVES, keyed by `hash(state.data) << 1 | agent` (the agent to move).
+    """
+    if BEST_MOVES:
+        return BEST_MOVES
+
+    level: list = [GameState()]
+    agent: int = 0
+    while level:
+        next_level: dict[int, GameState] = {}
+        for state in level:
+            # Values for the agent to move: X maximizes the game value and O minimizes it
+            sign: float = 1. if agent == 0 else -1.
+            best_value: float = -math.inf
+            for successor, pos in zip(state.generate_successors(agent), state.get_legal_moves()):
+                value = sign * alpha_beta_search(successor, agent == 1, tt=SHARED_TT)
+                if value > best_value:
+                    best_value = value
+                    BEST_MOVES[hash(state.data) << 1 | agent] = pos
+                if not successor.is_game_over():
+                    next_level[hash(successor.data)] = successor
+        level = list(next_level.values())
+        agent = 1 - agent
+    return BEST_MOVES
+
+
+def get_best_move(state, agent: int) -> int:
+    """
+    Get the best move of the agent in the state from the precomputed table of best moves.
+
+    Returns:
+    - int: The position of the best move, or -1 if the position cannot be reached in a game
+      where X moves first (e.g., a board set by hand), in which case it must be searched.
+    """
+    return precompute_best_moves().get(hash(state.data) << 1 | agent, -1)
+
+
+def order_moves(state, agent: int) -> list[int]:
+    """
+    Order the legal moves of the agent to maximize the alpha-beta cutoffs.
+
+    A move completing one of the agent's lines wins at once, and a move completing one of the
+    opponent's lines blocks a threat (any other move lets the opponent win): they are searched
+    first, then the other moves in the static order of `get_legal_moves` (center, corners, edges).
+
+    Parameters:
+    - agent (int): The agent to move (0 for X, 1 for O).
+
+    Returns:
+    - list[int]: The legal moves, winning moves first, then blocking moves, then the others.
+    """
+    x_bits: int = state.data.x_bits
+    o_bits: int = state.data.o_bits
+    own, other = (x_bits, o_bits) if agent == 0 else (o_bits, x_bits)
+    wins: list[int] = []
+    blocks: list[int] = []
+    others: list[int] = []
+    for pos in MOVES_OF_MASK[FULL_BOARD & ~(x_bits | o_bits)]:
+        bit: int = 1 << pos
+        if WINNING_BOARDS[own | bit]:
+            wins.append(pos)
+        elif WINNING_BOARDS[other | bit]:
+            blocks.append(pos)
+        else:
+            others.append(pos)
+    return wins + blocks + others
+
+
+def negamax(state, alpha: float, beta: float, color: float, tt: dict[int, tuple[int, float]] | None = None) -> float:
+    """
+    Alpha-beta negamax search.
+
+    Both players maximize the value of the game for themselves: the value of a node is the
+    maximum of the negated values of its children, searched with the window (-beta, -alpha).
+    `color` is 1 if player 0 (X) is to move and -1 if player 1 (O) is to move, and the value
+    returned is `color` times the value of the game for X.
+
+    The search is iterative: an explicit stack of frames replaces the recursion, which saves
+    a Python call per node. The state is modified in place during the search (apply the move
+    of the child being searched, undo it when its value is known) and restored before returning.
+
+    If a transposition table is given, positions already searched (reached through
+    another move order, or rotations/reflections of them) are answered from the table
+    instead of being searched again. Entries are keyed by the canonical key of the board
+    (identical for its 8 symmetric images, which have the same value) and the player to move.
+
+    Moves are searched in the order of `order_moves` (winning moves, blocking moves, then center,
+    corners, edges), which tries the strongest moves first to maximize the cutoffs.
+    """
+    # A frame per node being searched: [alpha, beta, best value, moves, index of the next move, agent to move, key, alpha on entry]
+    stack: list[list] = []
+    move = Action(agent=0, pos=-1)  # Scratch action: apply_action/undo_action do not keep a reference to it
+    value: float | None
+
+    while True:
+        # Enter the node of the state: answer it right away (terminal state or table hit), or push its frame
+        value = None
+        if state.is_game_over():
+            value = color * state.evaluate()
+        else:
+            key: int = 0
+            if tt is not None:
+                key = canonical_key(state.data) << 1 | (color > 0)
+                entry = tt.get(key)
+                if entry is not None:
+                    flag, tt_value = entry
+                    if flag == EXACT:
+                        value = tt_value
+                    else:
+                        if flag == LOWER:
+                            alpha = max(alpha, tt_value)
+                        else:
+                            beta = min(beta, tt_value)
+                        if alpha >= beta:
+                            value = tt_value
+            if value is None:
+                stack.append([alpha, beta, -math.inf, order_moves(state, 0 if color > 0 else 1), 0, 0 if color > 0 else 1, key, alpha])
+
+        # Pass the values up the stack until a node has a move left to search
+        while True:
+            frame = stack[-1] if stack else None
+            if value is not None:
+                if frame is None:
+                    return value  # The value of the root
+                # Undo the move leading to the node just searched, and negate its value for the parent
+                move.agent = frame[5]
+                move.pos = frame[3][frame[4] - 1]
+                state.undo_action(move)
+                if -value > frame[2]:
+                    frame[2] = -value
+                    if frame[2] > frame[0]:
+                        frame[0] = frame[2]
+                value = None
+
+            f_alpha, f_beta, best, moves, index, agent, key, alpha_entry = frame
+            if f_alpha < f_beta and index < len(moves):
+                # Search the next move, with the window of the child
+                move.agent = agent
+                move.pos = moves[index]
+                frame[4] = index + 1
+                state.apply_action(move)
+                alpha, beta, color = -f_beta, -f_alpha, (1. if agent == 1 else -1.)
+                break
+
+            # All the moves are searched, or the node is cut off
+            if tt is not None:
+                # The value is only a bound if the search failed outside the (alpha, beta) window
+                if best <= alpha_entry:
+                    tt[key] = (UPPER, best)
+                elif best >= f_beta:
+                    tt[key] = (LOWER, best)
+                else:
+                    tt[key] = (EXACT, best)
+            stack.pop()
+            value = best
+
+
+class TestMinimax(unittest.TestCase):
+
+    @staticmethod
+    def reachable_states() -> list[tuple[GameState, int]]:
+        """All the boards reachable in a game (X moving first), with the agent to move."""
+        states: dict[int, tuple[GameState, int]] = {0: (GameState(), 0)}
+        level: list[tuple[GameState, int]] = [(GameState(), 0)]
+        while level:
+            next_level: list[tuple[GameState, int]] = []
+            for state, agent in level:
+                if state.is_game_over():
+                    continue
+                for successor in state.generate_successors(agent):
+                    if hash(successor.data) not in states:
+                        states[hash(successor.data)] = (successor, 1 - agent)
+                        next_level.append((successor, 1 - agent))
+            level = next_level
+        return list(states.values())
+
+    @staticmethod
+    def brute_force_value(state: GameState, agent: int, memo: dict[int, float]) -> float:
+        """The value of the game for X, by plain minimax over the whole game tree (no pruning)."""
+        if state.is_game_over():
+            return state.evaluate()
+        key: int = hash(state.data) << 1 | agent
+        if key not in memo:
+            values = [TestMinimax.brute_force_value(successor, 1 - agent, memo) for successor in state.generate_successors(agent)]
+            memo[key] = max(values) if agent == 0 else min(values)
+        return memo[key]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.states = cls.reachable_states()
+        memo: dict[int, float] = {}
+        cls.values = [cls.brute_force_value(state, agent, memo) for state, agent in cls.states]
+
+    def test_reachable_states(self):
+        """Test that the enumeration finds the 5,478 boards reachable in a game."""
+        self.assertEqual(len(self.states), 5478)
+
+    def test_alpha_beta_matches_brute_force(self):
+        """Test that the alpha-beta search finds the exact value of every reachable board, with and without a table."""
+        tables = [None, {}, SHARED_TT]
+        for (state, agent), value in zip(self.states, self.values):
+            for tt in tables:
+                self.assertEqual(alpha_beta_search(state, agent == 0, tt=tt), value, state.data.squares)
+
+    def test_alpha_beta_window_bounds(self):
+        """Test that a search with a narrowed window returns the exact value inside it, and a correct bound outside."""
+        windows = [(-0.5, 0.5), (-1.5, -0.5), (0.5, 1.5), (-math.inf, 0.5), (-0.5, math.inf), (-1., 1.)]
+        tt: dict[int, tuple[int, float]] = {}  # Shared by the windows: the stored bounds must stay valid for all of them
+        for (state, agent), value in zip(self.states, self.values):
+            for alpha, beta in windows:
+                for table in (None, tt):
+                    result = alpha_beta_search(state, agent == 0, alpha=alpha, beta=beta, tt=table)
+                    if value <= alpha:
+                        self.assertLessEqual(result, alpha, state.data.squares)
+                    elif value >= beta:
+                        self.assertGreaterEqual(result, beta, state.data.squares)
+                    else:
+                        self.assertEqual(result, value, state.data.squares)
+        # The exact values are still found from the table filled by the windowed searches
+        for (state, agent), value in zip(self.states, self.values):
+            self.assertEqual(alpha_beta_search(state, agent == 0, tt=tt), value, state.data.squares)
+
+    def test_best_moves_are_optimal(self):
+        """Test that the precomputed best move of every reachable board keeps the value of the game."""
+        memo: dict[int, float] = {}
+        for (state, agent), value in zip(self.states, self.values):
+            if state.is_game_over():
+                continue
+            pos = get_best_move(state, agent)
+            self.assertIn(pos, state.get_legal_moves())
+            successor = state.generate_successor(Action(agent=agent, pos=pos))
+            self.assertEqual(self.brute_force_value(successor, 1 - agent, memo), value, state.data.squares)
+        self.assertEqual(len(precompute_best_moves()), 4520)
+
+    def test_order_moves(self):
+        """Test that winning moves come first, then blocking moves, then the others in static order."""
+        state = GameState()
+        state.data.squares = [1, 1, 0, 0, 2, 2, 0, 0, 0]  # X completes (0, 1, 2) on 2, O completes (3, 4, 5) on 3
+        self.assertEqual(order_moves(state, 0), [2, 3, 6, 8, 7])
+        self.assertEqual(order_moves(state, 1), [3, 2, 6, 8, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
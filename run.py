@@ -6,13 +6,14 @@ from gui import View, NoView, TextView, GUIView
 from game import GameController
 
 
-def get_controller_from_option(option: str, index: int) -> Controller:
+def get_controller_from_option(option: str, index: int, workers: int | None = 1) -> Controller:
     """
     Get a Controller for a player based on the selected option.
 
     Parameters:
     - option (str): The type of controller ("human", "agent", "minimax", "random").
     - index (int): The index of the player (used to identify the player).
+    - workers (int | None): The number of worker processes of the MCTS search (None: one per CPU).
 
     Returns:
     - Controller: A controller object for the player based on the selected option.
@@ -38,7 +39,7 @@ def get_controller_from_option(option: str, index: int) -> Controller:
     
     elif option == "mcts":
         # Return a MCTSController, used for an AI that uses monte carlo tree search algorithm
-        return MCTSController(index=index)
+        return MCTSController(index=index, workers=workers)
     
     elif option == "random":
         # Return an AgentController with a RandomAgent, which makes random moves
@@ -73,7 +74,7 @@ def get_view_from_option(option: str) -> View:
         return NoView()
 
 
-def play_game(view: View, player1: Controller, player2: Controller) -> int:
+def play_game(view: View, player1: Controller, player2: Controller, controller: GameController | None = None) -> int:
     """
     Play a game and return the outcome.
     
@@ -81,6 +82,8 @@ def play_game(view: View, player1: Controller, player2: Controller) -> int:
     - view (View): the renderer.
     - player1 (Controller): player 1 (X)
     - player2 (Controller): player 2 (O).
+    - controller (GameController | None): a game controller to reuse, created with the same view and players
+      (e.g., by a previous call in a tournament loop). If None, a new one is created.
     
     Returns:
     - outcome (int): the outcome of the game.
@@ -88,15 +91,18 @@ def play_game(view: View, player1: Controller, player2: Controller) -> int:
     # Initial state
     model: GameState = GameState()
 
-    # Game Controller
-    game: GameController = GameController(model=model,
-                                          view=view,
-                                          player1=player1,
-                                          player2=player2)
+    # Game Controller: reset the one given for the new game, or create it
+    if controller is None:
+        controller = GameController(model=model,
+                                    view=view,
+                                    player1=player1,
+                                    player2=player2)
+    else:
+        controller.reset(model)
     # Game loop
-    game.game_loop()
+    controller.game_loop()
 
-    return game.result()
+    return controller.result()
 
 
 def main(args) -> None:
@@ -104,11 +110,17 @@ def main(args) -> None:
     # View
     view: View = get_view_from_option(args.view)
     
-    # Controllers
-    player_1: Controller = get_controller_from_option(args.player1, 0)
-    player_2: Controller = get_controller_from_option(args.player2, 1)
+    # Controllers (0 workers: one MCTS worker per CPU)
+    workers: int | None = args.workers if args.workers > 0 else None
+    player_1: Controller = get_controller_from_option(args.player1, 0, workers)
+    player_2: Controller = get_controller_from_option(args.player2, 1, workers)
 
-    play_game(view=view, player1=player_1, player2=player_2)
+    try:
+        play_game(view=view, player1=player_1, player2=player_2)
+    finally:
+        # Shut down the worker processes of the controllers, if any
+        player_1.close()
+        player_2.close()
 
 
 if __name__ == "__main__":
@@ -116,5 +128,6 @@ if __name__ == "__main__":
     parser.add_argument("--view", type=str, help="Rendering of the game", choices=["gui", "text", "no-view"], default="no-view")
     parser.add_argument("--player1", type=str, help="Player 1", choices=["human", "minimax", "random", "mcts"], default="random")
     parser.add_argument("--player2", type=str, help="Player 2", choices=["human", "minimax", "random", "mcts"], default="random")
+    parser.add_argument("--workers", type=int, help="Worker processes of the MCTS search (0: one per CPU)", default=1)
     args = parser.parse_args()
     main(args)
\ No newline at end of file
@@ -1,72 +1,59 @@
 import pygame
 import numpy as np
+from functools import lru_cache
 from os import path as os_path
 from settings import GAME_H, GAME_W
 
+@lru_cache(maxsize=32)
 def get_image(path: str) -> pygame.Surface:
-    """Return a pygame image loaded from the given path."""
+    """Return a pygame image loaded from the given path (read from disk once, the surface is shared)."""
     cwd = os_path.dirname(__file__)
     image = pygame.image.load(cwd + "/" + path)
     return image
 
-def get_board_matrix(path: str) -> np.ndarray:
+@lru_cache(maxsize=32)
+def _get_board_matrix(path: str) -> np.ndarray:
     surface: pygame.Surface = get_image(path)
     return pygame.surfarray.array2d(surface)
 
-def inside_case(pos: tuple[int, int], board: np.ndarray) -> int:
+def get_board_matrix(path: str) -> np.ndarray:
+    """Return the pixels of the image at the given path, as a copy the caller is free to modify."""
+    return _get_board_matrix(path).copy()
+
+def get_case_lookup(board: np.ndarray) -> tuple[list[int], list[int]]:
     """
-    Check if the mouse is inside a case and return the position.
+    Precompute the bounding boxes of the cases as lookup tables over the screen pixels.
+
+    A click at (x, y) is inside the case at column `columns[x]` and row `rows[y]`
+    (-1 if it is outside the cases), i.e., the case `3 * columns[x] + rows[y]`,
+    without any work per click.
 
     Returns:
-    - pos(int): the pos of the case.
+    - tuple[list[int], list[int]]: the column of each screen pixel column and the row of each screen pixel row.
     """
     size_board = board.shape
     value_case: int = 5
-    lower_bounds: tuple[int, int] = (3, 3)
-    upper_bounds: tuple[int, int] = (95, 95)
-
-    board[0:lower_bounds[0], :] = 0
-    board[upper_bounds[1]:, :] = 0
-    board[:, 0:lower_bounds[1]] = 0
-    board[:, upper_bounds[1]:] = 0
-    board[board != value_case] = 0
-
-    x = int(pos[0]*size_board[0]/GAME_W)
-    y = int(pos[1]*size_board[1]/GAME_H)
-
     b1: int = 5
     b2: int = 37
     b3: int = 69
     space: int = 25
-    if board[x, y] == value_case:
-        if x >= b1 and x <= b1 + space:
-            if y >= b1 and y <= b1 + space:
-                return 0
-            elif y >= b2 and y <= b2 + space:
-                return 1
-            elif y >= b3 and y <= b3 + space:
-                return 2
-            else:
-                return -1
-        elif x >= b2 and x <= b2 + space:
-            if y >= b1 and y <= b1 + space:
-                return 3
-            elif y >= b2 and y <= b2 + space:
-                return 4
-            elif y >= b3 and y <= b3 + space:
-                return 5
-            else:
-                return -1
-        elif x >= b3 and x <= b3 + space:
-            if y >= b1 and y <= b1 + space:
-                return 6
-            elif y >= b2 and y <= b2 + space:
-                return 7
-            elif y >= b3 and y <= b3 + space:
-                return 8
-            else:
-                return -1
-        else:
+    # A line of pixels crossing the first column (resp. row) of cases, to exclude the grid lines
+    middle: int = b1 + space // 2
+
+    def case_index(coord: int, value: int) -> int:
+        if value != value_case:
             return -1
-    else:
+        for i, start in enumerate((b1, b2, b3)):
+            if start <= coord <= start + space:
+                return i
         return -1
+
+    columns: list[int] = []
+    for x in range(GAME_W):
+        board_x = int(x*size_board[0]/GAME_W)
+        columns.append(case_index(board_x, board[board_x, middle]))
+    rows: list[int] = []
+    for y in range(GAME_H):
+        board_y = int(y*size_board[1]/GAME_H)
+        rows.append(case_index(board_y, board[middle, board_y]))
+    return columns, rows